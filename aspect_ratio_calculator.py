@@ -3,49 +3,125 @@ Aspect Ratio Calculator node for ComfyUI
 Finds the optimal crop dimensions to match the nearest aspect ratio or uses a specified one
 """
 
+import re
+from functools import lru_cache
+
+# One "w:h" entry of the comma separated custom ratios string
+_RATIO_RE = re.compile(r'(?:^|,)\s*(\d+)\s*:\s*(\d+)\s*(?=,|$)')
+
+
+@lru_cache(maxsize=256)
+def _parse_custom_ratios(custom_ratios_str):
+    """Parse custom ratios string into an immutable tuple, cached per unique string"""
+    return tuple((int(w), int(h)) for w, h in _RATIO_RE.findall(custom_ratios_str)
+                 if int(w) > 0 and int(h) > 0)  # Validate positive numbers
+
+
+def calculate_dimensions_for_ratio(w, h, ratio_w, ratio_h):
+    """Calculate dimensions and pixel loss for a given ratio"""
+    # Compare w / h against ratio_w / ratio_h with exact integer math
+    if w * ratio_h > h * ratio_w:
+        height_units = h // ratio_h
+        new_height = height_units * ratio_h
+        new_width = height_units * ratio_w
+
+        if new_width > w:
+            width_units = w // ratio_w
+            new_width = width_units * ratio_w
+            new_height = width_units * ratio_h
+    else:
+        width_units = w // ratio_w
+        new_width = width_units * ratio_w
+        new_height = width_units * ratio_h
+
+        if new_height > h:
+            height_units = h // ratio_h
+            new_height = height_units * ratio_h
+            new_width = height_units * ratio_w
+
+    pixel_loss = (w * h) - (new_width * new_height)
+    return new_width, new_height, pixel_loss
+
+
+# Unrolled body of calculate_dimensions_for_ratio for one preset ratio, used by
+# _compile_ratio_search with {rw}, {rh} and {area} baked in as constants
+_RATIO_SEARCH_STEP = """\
+    if w * {rh} > h * {rw}:
+        units = h // {rh}
+        if units * {rw} > w:
+            units = w // {rw}
+    else:
+        units = w // {rw}
+        if units * {rh} > h:
+            units = h // {rh}
+    loss = pixels - units * units * {area}
+    if best is None or loss < best[4]:
+        best = (units * {rw}, units * {rh}, {rw}, {rh}, loss)
+        if not loss:
+            return best
+"""
+
+
+def _compile_ratio_search(ratios):
+    """Generate a function returning the (w, h, ratio_w, ratio_h, loss) with minimum
+    pixel loss over the given ratios, or None when there are none"""
+    source = ["def search(w, h):", "    pixels = w * h", "    best = None"]
+    for ratio_w, ratio_h in ratios:
+        ratio_w, ratio_h = int(ratio_w), int(ratio_h)
+        source.append(_RATIO_SEARCH_STEP.format(rw=ratio_w, rh=ratio_h, area=ratio_w * ratio_h))
+    source.append("    return best")
+    namespace = {}
+    exec(compile("\n".join(source), "<aspect_ratio_search>", "exec"), namespace)
+    return namespace["search"]
+
+
+# Input definitions are static metadata; build them once and share the dict
+_INPUT_TYPES = {
+    "required": {
+        "width": ("INT", {
+            "default": 1024,
+            "min": 1,
+            "max": 8192
+        }),
+        "height": ("INT", {
+            "default": 1024,
+            "min": 1,
+            "max": 8192
+        }),
+    },
+    "optional": {
+        "use_1_1": ("BOOLEAN", {"default": True}),     # 1024 x 1024
+        "use_2_3": ("BOOLEAN", {"default": True}),     # 683 x 1024
+        "use_3_2": ("BOOLEAN", {"default": True}),     # 1024 x 683
+        "use_4_3": ("BOOLEAN", {"default": True}),     # 1024 x 768
+        "use_3_4": ("BOOLEAN", {"default": True}),     # 768 x 1024
+        "use_16_9": ("BOOLEAN", {"default": True}),    # 1024 x 576
+        "use_9_16": ("BOOLEAN", {"default": True}),    # 576 x 1024
+        "custom_ratios": ("STRING", {
+            "multiline": False,
+            "default": "",
+            "placeholder": "Optional: 21:9,32:9,etc"
+        }),
+        "force_aspect_ratio_width": ("INT", {
+            "default": -1,
+            "min": -1,
+            "max": 8192,
+        }),
+        "force_aspect_ratio_height": ("INT", {
+            "default": -1,
+            "min": -1,
+            "max": 8192,
+        }),
+    }
+}
+
+
 class AspectRatioCalculatorNode:
     """Node that calculates the optimal crop resolution to match the nearest aspect ratio"""
     
     @classmethod
     def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "width": ("INT", {
-                    "default": 1024,
-                    "min": 1,
-                    "max": 8192
-                }),
-                "height": ("INT", {
-                    "default": 1024,
-                    "min": 1,
-                    "max": 8192
-                }),
-            },
-            "optional": {
-                "use_1_1": ("BOOLEAN", {"default": True}),     # 1024 x 1024
-                "use_2_3": ("BOOLEAN", {"default": True}),     # 683 x 1024
-                "use_3_2": ("BOOLEAN", {"default": True}),     # 1024 x 683
-                "use_4_3": ("BOOLEAN", {"default": True}),     # 1024 x 768
-                "use_3_4": ("BOOLEAN", {"default": True}),     # 768 x 1024
-                "use_16_9": ("BOOLEAN", {"default": True}),    # 1024 x 576
-                "use_9_16": ("BOOLEAN", {"default": True}),    # 576 x 1024
-                "custom_ratios": ("STRING", {
-                    "multiline": False,
-                    "default": "",
-                    "placeholder": "Optional: 21:9,32:9,etc"
-                }),
-                "force_aspect_ratio_width": ("INT", {
-                    "default": -1,
-                    "min": -1,
-                    "max": 8192,
-                }),
-                "force_aspect_ratio_height": ("INT", {
-                    "default": -1,
-                    "min": -1,
-                    "max": 8192,
-                }),
-            }
-        }
+        return _INPUT_TYPES
     
     RETURN_TYPES = ("INT", "INT", "INT", "INT")
     RETURN_NAMES = ("width", "height", "aspect_ratio_width", "aspect_ratio_height")
@@ -62,88 +138,72 @@ class AspectRatioCalculatorNode:
             "use_16_9": (16, 9),    # 1024 x 576
             "use_9_16": (9, 16),    # 576 x 1024
         }
+        # Bit i of an enabled mask selects self._ratio_values[i]
+        self._ratio_keys = tuple(self.ratios.keys())
+        self._ratio_values = tuple(self.ratios.values())
+        # Search specialized for the last seen checkbox selection
+        self._search_mask = None
+        self._search = None
 
     def parse_custom_ratios(self, custom_ratios_str):
-        """Parse custom ratios string into list of tuples"""
-        if not custom_ratios_str.strip():
-            return []
-            
-        try:
-            ratios = []
-            for ratio in custom_ratios_str.split(','):
-                if ':' not in ratio:
-                    continue
-                w, h = map(int, ratio.strip().split(':'))
-                if w > 0 and h > 0:  # Validate positive numbers
-                    ratios.append((w, h))
-            return ratios
-        except (ValueError, TypeError):
-            print(f"Warning: Invalid custom ratio format: {custom_ratios_str}")
-            return []
-
-    def get_enabled_ratios(self, custom_ratios, **kwargs):
-        """Get list of enabled ratios based on checkbox inputs and custom ratios"""
-        enabled = [ratio for key, ratio in self.ratios.items() 
-                  if kwargs.get(key, False)]
-        
-        # Add custom ratios
-        custom = self.parse_custom_ratios(custom_ratios)
-        return enabled + custom
+        """Parse custom ratios string into tuple of (w, h) tuples, skipping malformed entries"""
+        return _parse_custom_ratios(custom_ratios_str)
+
+    def _enabled_mask(self, kwargs):
+        """Build a bitmask of the preset ratios enabled by checkbox inputs"""
+        mask = 0
+        for i, key in enumerate(self._ratio_keys):
+            if kwargs.get(key, False):
+                mask |= 1 << i
+        return mask
+
+    def _iter_enabled_ratios(self, mask):
+        """Yield the preset ratios selected by mask, in preset order"""
+        while mask:
+            i = (mask & -mask).bit_length() - 1
+            yield self._ratio_values[i]
+            mask &= mask - 1
+
+    def calculate_forced(self, width, height, ratio_w, ratio_h):
+        """Crop to a fixed ratio without touching the checkbox inputs"""
+        new_width, new_height, _ = calculate_dimensions_for_ratio(width, height, ratio_w, ratio_h)
+        return (new_width, new_height, ratio_w, ratio_h)
+
+    def calculate_auto(self, width, height, mask, custom_ratios=""):
+        """Crop to the enabled ratio with minimum pixel loss.
+
+        mask is an int with bit i set when self._ratio_keys[i] is enabled,
+        as built by _enabled_mask.
+        """
+        # Checkbox selections rarely change between runs, so the preset search is
+        # compiled once per selection and rebuilt only when the mask changes
+        if mask != self._search_mask:
+            self._search = _compile_ratio_search(self._iter_enabled_ratios(mask))
+            self._search_mask = mask
+
+        # Find the enabled ratio with minimum pixel loss, then try custom ratios
+        best_result = self._search(width, height)
+        for ratio_w, ratio_h in self.parse_custom_ratios(custom_ratios):
+            if best_result is not None and not best_result[4]:
+                break  # An exact fit cannot be improved
+            new_w, new_h, loss = calculate_dimensions_for_ratio(width, height, ratio_w, ratio_h)
+            if best_result is None or loss < best_result[4]:
+                best_result = (new_w, new_h, ratio_w, ratio_h, loss)
+
+        if best_result is None:
+            return (width, height, 1, 1)
+
+        return (best_result[0], best_result[1], best_result[2], best_result[3])
 
     def calculate(self, width, height, force_aspect_ratio_width=-1, force_aspect_ratio_height=-1, 
                  custom_ratios="", **kwargs):
         """Calculate the optimal crop resolution based on nearest aspect ratio or forced ratio"""
         
-        def calculate_dimensions_for_ratio(w, h, ratio_w, ratio_h):
-            """Calculate dimensions and pixel loss for a given ratio"""
-            current_r = w / h
-            target_r = ratio_w / ratio_h
-            
-            if current_r > target_r:
-                height_units = h // ratio_h
-                new_height = height_units * ratio_h
-                new_width = height_units * ratio_w
-                
-                if new_width > w:
-                    width_units = w // ratio_w
-                    new_width = width_units * ratio_w
-                    new_height = width_units * ratio_h
-            else:
-                width_units = w // ratio_w
-                new_width = width_units * ratio_w
-                new_height = width_units * ratio_h
-                
-                if new_height > h:
-                    height_units = h // ratio_h
-                    new_height = height_units * ratio_h
-                    new_width = height_units * ratio_w
-            
-            pixel_loss = (w * h) - (new_width * new_height)
-            return new_width, new_height, pixel_loss
-        
         # If forced aspect ratio is provided
         if force_aspect_ratio_width > 0 and force_aspect_ratio_height > 0:
-            new_width, new_height, _ = calculate_dimensions_for_ratio(
-                width, height, force_aspect_ratio_width, force_aspect_ratio_height
-            )
-            return (new_width, new_height, force_aspect_ratio_width, force_aspect_ratio_height)
-        
-        # Get enabled ratios
-        enabled_ratios = self.get_enabled_ratios(custom_ratios, **kwargs)
-        if not enabled_ratios:
-            return (width, height, 1, 1)
-        
-        # Calculate dimensions and pixel loss for each ratio
-        results = []
-        for ratio in enabled_ratios:
-            new_w, new_h, loss = calculate_dimensions_for_ratio(width, height, ratio[0], ratio[1])
-            results.append((new_w, new_h, ratio[0], ratio[1], loss))
-        
-        # Choose ratio with minimum pixel loss
-        results.sort(key=lambda x: x[4])  # Sort by pixel loss
-        best_result = results[0]
-        
-        return (best_result[0], best_result[1], best_result[2], best_result[3])
+            return self.calculate_forced(width, height, force_aspect_ratio_width, force_aspect_ratio_height)
+
+        return self.calculate_auto(width, height, self._enabled_mask(kwargs), custom_ratios)
 
 # This part is required to register the node with ComfyUI
 NODE_CLASS_MAPPINGS = {
@@ -3,58 +3,78 @@ Resolution Matcher node for ComfyUI
 Selects the closest predefined resolution that matches the input aspect ratio
 """
 
+import re
+from functools import lru_cache
+from itertools import chain
+from math import gcd
+
+# One "WxH" entry of the comma separated custom resolutions string
+_RESOLUTION_RE = re.compile(r'(?:^|,)\s*(\d+)\s*x\s*(\d+)\s*(?=,|$)')
+
+
+@lru_cache(maxsize=256)
+def _parse_custom_resolutions(custom_resolutions_str):
+    """Parse custom resolutions string into an immutable tuple, cached per unique string"""
+    return tuple((int(w), int(h)) for w, h in _RESOLUTION_RE.findall(custom_resolutions_str)
+                 if int(w) > 0 and int(h) > 0)  # Validate positive numbers
+
+
+# Input definitions are static metadata; build them once and share the dict
+_INPUT_TYPES = {
+    "required": {
+        "width": ("INT", {
+            "default": 1024,
+            "min": 1,
+            "max": 8192
+        }),
+        "height": ("INT", {
+            "default": 1024,
+            "min": 1,
+            "max": 8192
+        }),
+    },
+    "optional": {
+        # SD1.5 resolutions
+        "use_sd15_1:1_512x512": ("BOOLEAN", {"default": False}),    # 512x512
+        "use_sd1.5/sdxl_1:1_768x768": ("BOOLEAN", {"default": False}),    # 768x768 (works for both SD1.5 and SDXL)
+        "use_sd15_3:2_768x512": ("BOOLEAN", {"default": False}),    # 768x512
+        "use_sd15_2:3_512x768": ("BOOLEAN", {"default": False}),    # 512x768
+        "use_sd15_4:3_768x576": ("BOOLEAN", {"default": False}),    # 768x576
+        "use_sd15_3:4_576x768": ("BOOLEAN", {"default": False}),    # 576x768
+        "use_sd15_16:9_912x512": ("BOOLEAN", {"default": False}),   # 912x512
+        "use_sd15_9:16_512x912": ("BOOLEAN", {"default": False}),   # 512x912
+        
+        # SDXL resolutions
+        "use_sdxl_1:1_1024x1024": ("BOOLEAN", {"default": False}),  # 1024x1024
+        "use_sdxl_3:2_1152x768": ("BOOLEAN", {"default": False}),   # 1152x768
+        "use_sdxl_2:3_768x1152": ("BOOLEAN", {"default": False}),   # 768x1152
+        "use_sdxl_4:3_1152x864": ("BOOLEAN", {"default": False}),   # 1152x864
+        "use_sdxl_3:4_864x1152": ("BOOLEAN", {"default": False}),   # 864x1152
+        "use_sdxl_16:9_1360x768": ("BOOLEAN", {"default": False}),  # 1360x768
+        "use_sdxl_9:16_768x1360": ("BOOLEAN", {"default": False}),  # 768x1360
+        
+        # Flux resolutions
+        "use_flux_1:1_1408x1408": ("BOOLEAN", {"default": False}),  # 1408x1408
+        "use_flux_3:2_1728x1152": ("BOOLEAN", {"default": False}),  # 1728x1152
+        "use_flux_4:3_1664x1216": ("BOOLEAN", {"default": False}),  # 1664x1216
+        "use_flux_16:9_1920x1088": ("BOOLEAN", {"default": False}), # 1920x1088
+        "use_flux_21:9_2176x960": ("BOOLEAN", {"default": False}),  # 2176x960
+        
+        "custom_resolutions": ("STRING", {
+            "multiline": False,
+            "default": "",
+            "placeholder": "Optional: 1920x1080,1280x720,etc"
+        }),
+    }
+}
+
+
 class ResolutionMatcherNode:
     """Node that matches input resolution to the closest predefined resolution with the same aspect ratio"""
     
     @classmethod
     def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "width": ("INT", {
-                    "default": 1024,
-                    "min": 1,
-                    "max": 8192
-                }),
-                "height": ("INT", {
-                    "default": 1024,
-                    "min": 1,
-                    "max": 8192
-                }),
-            },
-            "optional": {
-                # SD1.5 resolutions
-                "use_sd15_1:1_512x512": ("BOOLEAN", {"default": False}),    # 512x512
-                "use_sd1.5/sdxl_1:1_768x768": ("BOOLEAN", {"default": False}),    # 768x768 (works for both SD1.5 and SDXL)
-                "use_sd15_3:2_768x512": ("BOOLEAN", {"default": False}),    # 768x512
-                "use_sd15_2:3_512x768": ("BOOLEAN", {"default": False}),    # 512x768
-                "use_sd15_4:3_768x576": ("BOOLEAN", {"default": False}),    # 768x576
-                "use_sd15_3:4_576x768": ("BOOLEAN", {"default": False}),    # 576x768
-                "use_sd15_16:9_912x512": ("BOOLEAN", {"default": False}),   # 912x512
-                "use_sd15_9:16_512x912": ("BOOLEAN", {"default": False}),   # 512x912
-                
-                # SDXL resolutions
-                "use_sdxl_1:1_1024x1024": ("BOOLEAN", {"default": False}),  # 1024x1024
-                "use_sdxl_3:2_1152x768": ("BOOLEAN", {"default": False}),   # 1152x768
-                "use_sdxl_2:3_768x1152": ("BOOLEAN", {"default": False}),   # 768x1152
-                "use_sdxl_4:3_1152x864": ("BOOLEAN", {"default": False}),   # 1152x864
-                "use_sdxl_3:4_864x1152": ("BOOLEAN", {"default": False}),   # 864x1152
-                "use_sdxl_16:9_1360x768": ("BOOLEAN", {"default": False}),  # 1360x768
-                "use_sdxl_9:16_768x1360": ("BOOLEAN", {"default": False}),  # 768x1360
-                
-                # Flux resolutions
-                "use_flux_1:1_1408x1408": ("BOOLEAN", {"default": False}),  # 1408x1408
-                "use_flux_3:2_1728x1152": ("BOOLEAN", {"default": False}),  # 1728x1152
-                "use_flux_4:3_1664x1216": ("BOOLEAN", {"default": False}),  # 1664x1216
-                "use_flux_16:9_1920x1088": ("BOOLEAN", {"default": False}), # 1920x1088
-                "use_flux_21:9_2176x960": ("BOOLEAN", {"default": False}),  # 2176x960
-                
-                "custom_resolutions": ("STRING", {
-                    "multiline": False,
-                    "default": "",
-                    "placeholder": "Optional: 1920x1080,1280x720,etc"
-                }),
-            }
-        }
+        return _INPUT_TYPES
     
     RETURN_TYPES = ("INT", "INT")
     RETURN_NAMES = ("width", "height")
@@ -91,73 +111,52 @@ class ResolutionMatcherNode:
             "use_flux_21:9_2176x960": (2176, 960),
         }
 
+        # Group presets by reduced aspect ratio so a call only visits candidates
+        # that share the input ratio
+        self._presets_by_ratio = {}
+        for key, (w, h) in self.resolutions.items():
+            d = gcd(w, h)
+            self._presets_by_ratio.setdefault((w // d, h // d), []).append((w, h, key))
+
     def parse_custom_resolutions(self, custom_resolutions_str):
-        """Parse custom resolutions string into list of tuples"""
-        if not custom_resolutions_str.strip():
-            return []
-            
-        try:
-            resolutions = []
-            for res in custom_resolutions_str.split(','):
-                if 'x' not in res:
-                    continue
-                w, h = map(int, res.strip().split('x'))
-                if w > 0 and h > 0:  # Validate positive numbers
-                    resolutions.append((w, h))
-            return resolutions
-        except (ValueError, TypeError):
-            print(f"Warning: Invalid custom resolution format: {custom_resolutions_str}")
-            return []
-
-    def get_enabled_resolutions(self, custom_resolutions, **kwargs):
-        """Get list of enabled resolutions based on checkbox inputs and custom resolutions"""
-        enabled = [res for key, res in self.resolutions.items() 
-                  if kwargs.get(key, False)]
-        
-        # Add custom resolutions
-        custom = self.parse_custom_resolutions(custom_resolutions)
-        return enabled + custom
+        """Parse custom resolutions string into tuple of (w, h) tuples, skipping malformed entries"""
+        return _parse_custom_resolutions(custom_resolutions_str)
 
     def match_resolution(self, width, height, custom_resolutions="", **kwargs):
         """Match input resolution to the closest predefined resolution with same aspect ratio"""
-        
-        def calculate_aspect_ratio(w, h):
-            """Calculate reduced aspect ratio"""
-            from math import gcd
-            d = gcd(w, h)
-            return (w // d, h // d)
-        
-        def calculate_pixel_difference(w1, h1, w2, h2):
-            """Calculate percentage difference in total pixels"""
-            pixels1 = w1 * h1
-            pixels2 = w2 * h2
-            return abs(pixels2 - pixels1) / pixels1 * 100
 
         # Get input aspect ratio
-        input_ratio = calculate_aspect_ratio(width, height)
+        d = gcd(width, height)
+        input_ratio = (width // d, height // d)
         input_pixels = width * height
 
-        # Get enabled resolutions
-        enabled_resolutions = self.get_enabled_resolutions(custom_resolutions, **kwargs)
-        if not enabled_resolutions:
-            return (width, height)
+        # Enabled presets and custom resolutions with the same aspect ratio
+        ratio_w, ratio_h = input_ratio
+        enabled = ((res_w, res_h)
+                   for res_w, res_h, key in self._presets_by_ratio.get(input_ratio, ())
+                   if kwargs.get(key, False))
+        custom = ((res_w, res_h)
+                  for res_w, res_h in self.parse_custom_resolutions(custom_resolutions)
+                  if res_w * ratio_h == res_h * ratio_w)
 
-        # Find resolutions with matching aspect ratio
-        matching_resolutions = []
-        for res_w, res_h in enabled_resolutions:
-            if calculate_aspect_ratio(res_w, res_h) == input_ratio:
-                pixel_diff = calculate_pixel_difference(width, height, res_w, res_h)
-                matching_resolutions.append((res_w, res_h, pixel_diff))
+        # Keep the smallest pixel difference and prefer larger resolutions when difference is similar.
+        # Input pixels are constant across candidates, so the absolute difference ranks the same as a percentage
+        best_match = None
+        best_rank = None
+        for res_w, res_h in chain(enabled, custom):
+            res_pixels = res_w * res_h
+            rank = (abs(res_pixels - input_pixels), -res_pixels)
+            if best_rank is None or rank < best_rank:
+                best_match = (res_w, res_h)
+                best_rank = rank
+                if not rank[0]:
+                    break  # Same pixel count as the input cannot be improved
 
         # If no matching aspect ratios found, return original resolution
-        if not matching_resolutions:
+        if best_match is None:
             return (width, height)
 
-        # Sort by pixel difference and prefer larger resolutions when difference is similar
-        matching_resolutions.sort(key=lambda x: (x[2], -(x[0] * x[1])))
-        
-        # Return the best match
-        return (matching_resolutions[0][0], matching_resolutions[0][1])
+        return best_match
 
 # Register the node with ComfyUI
 NODE_CLASS_MAPPINGS = {